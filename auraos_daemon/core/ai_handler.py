@@ -5,6 +5,7 @@ Integrates with daemon, screen capture context, and removes confirmation barrier
 import logging
 import subprocess
 import json
+import re
 import requests
 import os
 import time
@@ -14,6 +15,18 @@ from core.screen_context import ScreenCaptureManager, ScreenContextDB
 
 logger = logging.getLogger(__name__)
 
+# Command output sent back to the model is stripped of terminal colour codes and
+# cut to its last MAX_MODEL_OUTPUT chars; the end is where errors usually are
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*[a-zA-Z]')
+MAX_MODEL_OUTPUT = 1024
+
+
+def compact_output(text: str) -> str:
+    """Shrink command output for inclusion in a model request."""
+    if not text:
+        return text
+    return ANSI_ESCAPE_RE.sub('', text)[-MAX_MODEL_OUTPUT:]
+
 
 class EnhancedAIHandler:
     """Handles AI task generation, execution, and result reporting"""
@@ -25,6 +38,8 @@ class EnhancedAIHandler:
         self.base_url = f"http://{daemon_host}:{daemon_port}"
         self.screen_manager = ScreenCaptureManager()
         self.execution_log = []
+        # Each request makes several calls to the local daemon; reuse one connection
+        self.session = requests.Session()
     
     def process_ai_request(self, user_input: str, auto_execute: bool = True) -> Dict:
         """
@@ -185,7 +200,7 @@ class EnhancedAIHandler:
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/generate_script",
                 json=payload,
                 timeout=30
@@ -274,12 +289,12 @@ class EnhancedAIHandler:
         payload = {
             'intent': intent,
             'script': script,
-            'output': stdout,
-            'error': stderr
+            'output': compact_output(stdout),
+            'error': compact_output(stderr)
         }
         
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.base_url}/validate_output",
                 json=payload,
                 timeout=30
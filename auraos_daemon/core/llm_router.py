@@ -3,10 +3,13 @@ LLM Router for AuraOS Autonomous AI Daemon v8
 Intelligently routes requests between local Ollama and cloud Groq API
 """
 import logging
+import threading
 import time
 import requests
 import json
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Load config
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -45,6 +48,72 @@ except Exception as e:
     PREFER_LOCAL = True
     FALLBACK_TO_CLOUD = True
 
+# One keep-alive session for Groq and Ollama so repeated calls reuse pooled
+# connections instead of paying the TCP/TLS handshake on every request.
+# Retries cover failed connection attempts for every call. The 429/5xx
+# retries only apply to the GET availability check: urllib3 does not retry
+# POSTs on a status code (allowed_methods), and that is intended, since a
+# completion the server already ran would be billed twice.
+SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504]),
+)
+SESSION.mount("http://", _ADAPTER)
+SESSION.mount("https://", _ADAPTER)
+
+# Request bodies differ only in "messages", so the static fields are encoded
+# once and each call splices in the encoded messages array
+_GROQ_BODY_PREFIX = json.dumps({"model": GROQ_MODEL, "temperature": 0.1})[:-1].encode("utf-8")
+_OLLAMA_BODY_PREFIX = json.dumps({"model": OLLAMA_MODEL, "stream": False})[:-1].encode("utf-8")
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+def _request_body(prefix, messages):
+    """JSON body bytes: a pre-encoded static prefix plus the messages array."""
+    return prefix + b', "messages": ' + json.dumps(messages).encode("utf-8") + b"}"
+
+# (connect, read): fail fast on an unreachable host, allow slow generations
+REQUEST_TIMEOUT = (3.05, 60)
+
+
+class CircuitBreaker:
+    """Skip a provider after repeated failures instead of waiting on it each time.
+
+    After fail_max consecutive failures the circuit opens and calls are refused
+    for reset_timeout seconds; then one trial call is let through, and its
+    result closes the circuit or keeps it open.
+    """
+
+    def __init__(self, fail_max=5, reset_timeout=30):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.time() - self.opened_at >= self.reset_timeout:
+                # restart the window so only one trial call goes through
+                self.opened_at = time.time()
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.fail_max:
+                self.opened_at = time.time()
+
 
 class LLMRouter:
     """Routes LLM requests to the most appropriate model"""
@@ -52,6 +121,8 @@ class LLMRouter:
     def __init__(self):
         self.ollama_available = self._check_ollama_availability()
         self.groq_available = bool(GROQ_API_KEY)
+        self.ollama_breaker = CircuitBreaker()
+        self.groq_breaker = CircuitBreaker()
         
         logging.info(f"LLM Router initialized:")
         logging.info(f"  - Ollama: {'Available' if self.ollama_available else 'Not available'}")
@@ -63,7 +134,7 @@ class LLMRouter:
             return False
         
         try:
-            response = requests.get(
+            response = SESSION.get(
                 f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/tags",
                 timeout=2
             )
@@ -178,7 +249,7 @@ class LLMRouter:
                 # High complexity - use cloud
                 logging.info(f"Routing to Groq (complexity {complexity} >= {COMPLEXITY_THRESHOLD})")
                 if self.groq_available:
-                    return self._call_groq(prompt, context)
+                    return self._call_groq_or_ollama(prompt, context)
                 elif self.ollama_available:
                     logging.warning("Groq not available, falling back to Ollama")
                     return self._call_ollama(prompt, context)
@@ -192,7 +263,7 @@ class LLMRouter:
             # Prefer cloud, fallback to local
             if self.groq_available:
                 logging.info("Routing to Groq (cloud preferred)")
-                return self._call_groq(prompt, context)
+                return self._call_groq_or_ollama(prompt, context)
             elif self.ollama_available:
                 logging.info("Groq not available, using Ollama")
                 return self._call_ollama(prompt, context)
@@ -203,8 +274,24 @@ class LLMRouter:
                     'model': None
                 }
     
+    def _call_groq_or_ollama(self, prompt, context=None):
+        """Call Groq, using Ollama instead while Groq's circuit is open"""
+        result = self._call_groq(prompt, context)
+        if result.get('circuit_open') and self.ollama_available:
+            logging.warning("Groq circuit open, falling back to Ollama")
+            return self._call_ollama(prompt, context)
+        return result
+    
     def _call_ollama(self, prompt, context=None):
         """Call local Ollama model"""
+        if not self.ollama_breaker.allow():
+            return {
+                'success': False,
+                'error': 'Ollama circuit open after repeated failures',
+                'circuit_open': True,
+                'model': f"ollama/{OLLAMA_MODEL}",
+                'latency_ms': 0
+            }
         start_time = time.time()
         
         try:
@@ -215,22 +302,18 @@ class LLMRouter:
             messages.append({"role": "user", "content": prompt})
             
             # Call Ollama API
-            payload = {
-                "model": OLLAMA_MODEL,
-                "messages": messages,
-                "stream": False
-            }
-            
-            response = requests.post(
+            response = SESSION.post(
                 f"http://{OLLAMA_HOST}:{OLLAMA_PORT}/api/chat",
-                json=payload,
-                timeout=60
+                data=_request_body(_OLLAMA_BODY_PREFIX, messages),
+                headers=_JSON_HEADERS,
+                timeout=REQUEST_TIMEOUT
             )
             response.raise_for_status()
             
             data = response.json()
             latency_ms = int((time.time() - start_time) * 1000)
             
+            self.ollama_breaker.record_success()
             return {
                 'success': True,
                 'model': f"ollama/{OLLAMA_MODEL}",
@@ -241,6 +324,7 @@ class LLMRouter:
             
         except requests.exceptions.RequestException as e:
             logging.error(f"Ollama API error: {e}")
+            self.ollama_breaker.record_failure()
             return {
                 'success': False,
                 'error': str(e),
@@ -249,6 +333,7 @@ class LLMRouter:
             }
         except Exception as e:
             logging.error(f"Unexpected error calling Ollama: {e}")
+            self.ollama_breaker.record_failure()
             return {
                 'success': False,
                 'error': str(e),
@@ -257,6 +342,14 @@ class LLMRouter:
     
     def _call_groq(self, prompt, context=None):
         """Call cloud Groq API"""
+        if not self.groq_breaker.allow():
+            return {
+                'success': False,
+                'error': 'Groq circuit open after repeated failures',
+                'circuit_open': True,
+                'model': f"groq/{GROQ_MODEL}",
+                'latency_ms': 0
+            }
         start_time = time.time()
         
         try:
@@ -267,28 +360,23 @@ class LLMRouter:
             messages.append({"role": "user", "content": prompt})
             
             # Call Groq API
-            payload = {
-                "model": GROQ_MODEL,
-                "messages": messages,
-                "temperature": 0.1
-            }
-            
             headers = {
                 "Authorization": f"Bearer {GROQ_API_KEY}",
                 "Content-Type": "application/json"
             }
             
-            response = requests.post(
+            response = SESSION.post(
                 GROQ_API_URL,
                 headers=headers,
-                json=payload,
-                timeout=60
+                data=_request_body(_GROQ_BODY_PREFIX, messages),
+                timeout=REQUEST_TIMEOUT
             )
             response.raise_for_status()
             
             data = response.json()
             latency_ms = int((time.time() - start_time) * 1000)
             
+            self.groq_breaker.record_success()
             return {
                 'success': True,
                 'model': f"groq/{GROQ_MODEL}",
@@ -299,6 +387,7 @@ class LLMRouter:
             
         except requests.exceptions.RequestException as e:
             logging.error(f"Groq API error: {e}")
+            self.groq_breaker.record_failure()
             return {
                 'success': False,
                 'error': str(e),
@@ -307,6 +396,7 @@ class LLMRouter:
             }
         except Exception as e:
             logging.error(f"Unexpected error calling Groq: {e}")
+            self.groq_breaker.record_failure()
             return {
                 'success': False,
                 'error': str(e),
@@ -22,6 +22,28 @@ import requests
 
 logger = logging.getLogger(__name__)
 
+# Static part of the planning prompt
+PLANNER_INSTRUCTIONS = """You are a UI automation agent. Your task is to plan the next actions to achieve the goal.
+Each action should be simple and deterministic.
+
+Valid actions:
+- click at (x, y)
+- type "text"
+- key press: enter, backspace, tab, escape, arrow_up, arrow_down, arrow_left, arrow_right
+- wait N seconds
+- screenshot (for visual confirmation)
+
+Return a JSON array of actions:
+[
+  {"action": "click", "x": 100, "y": 200},
+  {"action": "type", "text": "hello"},
+  {"action": "key", "key": "enter"},
+  ...
+]
+
+Think step-by-step about what UI elements to interact with. Be concise.
+"""
+
 
 class LocalPlanner:
     """
@@ -48,6 +70,8 @@ class LocalPlanner:
         self.timeout = timeout
         self.vision_model = vision_model
         self.action_history: List[Dict[str, Any]] = []
+        # Keep-alive connection to Ollama across planning calls
+        self.session = requests.Session()
 
     def plan(
         self,
@@ -103,8 +127,9 @@ class LocalPlanner:
                 )
             )
 
-        prompt = f"""You are a UI automation agent. Your task is to plan the next actions to achieve the goal.
-
+        # Fixed instructions first, per-call state last, so consecutive planning
+        # calls share a prompt prefix the model server can reuse
+        prompt = f"""{PLANNER_INSTRUCTIONS}
 Current screen state:
 {screen_summary}
 {regions_text}
@@ -112,31 +137,14 @@ Current screen state:
 User goal: {goal}
 {history_text}
 
-Plan the next {max_actions} actions to achieve the goal. Each action should be simple and deterministic.
-
-Valid actions:
-- click at (x, y)
-- type "text"
-- key press: enter, backspace, tab, escape, arrow_up, arrow_down, arrow_left, arrow_right
-- wait N seconds
-- screenshot (for visual confirmation)
-
-Return a JSON array of actions:
-[
-  {{"action": "click", "x": 100, "y": 200}},
-  {{"action": "type", "text": "hello"}},
-  {{"action": "key", "key": "enter"}},
-  ...
-]
-
-Think step-by-step about what UI elements to interact with. Be concise."""
+Plan the next {max_actions} actions to achieve the goal."""
 
         return prompt
 
     def _query_ollama(self, model: str, prompt: str) -> str:
         """Query Ollama with the prompt."""
         try:
-            response = requests.post(
+            response = self.session.post(
                 f"{self.ollama_url}/api/generate",
                 json={
                     "model": model,
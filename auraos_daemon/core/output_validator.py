@@ -19,6 +19,9 @@ class OutputValidator:
         self.api_key = self.config.get("GROQ_API_KEY")
         self.api_url = self.config.get("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
         self.model = self.config.get("GROQ_MODEL", "llama3-70b-8192")
+        # Validation and improvement calls go to the same endpoint back to back;
+        # a keep-alive session reuses the TLS connection between them
+        self.session = requests.Session()
         
     def validate_output(self, intent, script, output, error=None):
         """
@@ -120,7 +123,7 @@ class OutputValidator:
                 "temperature": 0.2
             }
             
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=60)
+            response = self.session.post(self.api_url, headers=headers, json=payload, timeout=(3.05, 60))
             response.raise_for_status()
             
             return response.json()["choices"][0]["message"]["content"]
@@ -223,7 +226,7 @@ class OutputValidator:
                 "temperature": 0.2
             }
             
-            response = requests.post(self.api_url, headers=headers, json=payload, timeout=60)
+            response = self.session.post(self.api_url, headers=headers, json=payload, timeout=(3.05, 60))
             response.raise_for_status()
             
             improved_script = response.json()["choices"][0]["message"]["content"]
@@ -1,7 +1,8 @@
 # daemon.py
 # AuraOS Autonomous AI Daemon v8.4
-import os, json, requests, subprocess, logging, base64, re, threading, time
-from flask import Flask, request, jsonify
+import os, json, requests, subprocess, signal, logging, logging.handlers, re, tempfile, threading, time, hashlib, functools, sqlite3, selectors, queue, atexit
+from collections import OrderedDict
+from flask import Flask, Response, request, jsonify
 from core.llm_router import get_router
 from core import ai_helper
 
@@ -14,15 +15,34 @@ CONFIG_PATH = os.path.join(BASE_DIR, "config.json")
 LOG_PATH = os.path.join(BASE_DIR, "aura_os.log")
 DAEMON_PATH = os.path.join(BASE_DIR, "daemon.py")
 UPDATER_PATH = os.path.join(BASE_DIR, "updater.py")
+SCRIPT_CACHE_PATH = os.path.join(BASE_DIR, "script_cache.sqlite")
+# Self-update payloads are written to tmpfs when available
+UPDATE_PAYLOAD_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else None
+# /execute_script kills a script's process group after this many seconds and
+# reports a timeout. Set AURAOS_SCRIPT_KEEP_RUNNING=1 to leave it running
+# instead (e.g. a foreground GUI program the user is still working in); its
+# output after the timeout is then discarded.
+SCRIPT_TIMEOUT = int(os.environ.get("AURAOS_SCRIPT_TIMEOUT", "300"))
+SCRIPT_KEEP_RUNNING = os.environ.get("AURAOS_SCRIPT_KEEP_RUNNING", "").lower() in ("1", "true", "yes")
+# Only the tail of a script's stdout/stderr is kept, so a chatty command
+# (find /, ls -R) cannot grow the daemon's memory without bound
+SCRIPT_OUTPUT_LIMIT = 1024 * 1024
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.FileHandler(LOG_PATH),
-        logging.StreamHandler()
-    ]
-)
+# Flask request threads only put records on a queue; the listener thread writes
+# the log file (rotated at 4 MB, which keeps tail_log cheap) and the console
+_log_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(message)s")
+_log_handlers = [
+    logging.handlers.RotatingFileHandler(LOG_PATH, maxBytes=4 * 1024 * 1024, backupCount=4),
+    logging.StreamHandler()
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+logging.root.setLevel(logging.INFO)
+logging.root.addHandler(logging.handlers.QueueHandler(_log_queue))
 
 # --- Load config ---
 try:
@@ -44,6 +64,14 @@ COMPLEX_TASK_KEYWORDS = [
     "scrape", "list of", "find data", "get information on", "what are", "who are"
 ]
 
+# Fixed instructions for /generate_script, built once. Kept as the leading part
+# of the system prompt so providers with prefix caching can reuse it.
+SCRIPT_SYSTEM_PROMPT = (
+    "You are AuraOS's autonomous daemon. Generate either a Python or shell script based on the intent.\n"
+    "Self-modify if the request includes 'learn', 'add a feature', 'improve', or 'modify yourself'.\n\n"
+    'Return JSON: {"script_type": "shell" or "python", "script": "..."}\n\n'
+)
+
 # Initialize a shared LLM router (may be None if unavailable)
 try:
     ROUTER = get_router()
@@ -52,27 +80,139 @@ except Exception as e:
     logging.warning(f"Failed to initialize LLM Router: {e}")
     ROUTER = None
 
+def _json_response(obj, status=200):
+    """JSON response for hot endpoints, encoded straight to bytes by ai_helper."""
+    return Response(ai_helper.dumps_json(obj), status=status, mimetype="application/json")
+
+# Generated scripts are cached per (provider, model, intent, cwd, windows) so
+# repeated requests skip the model round-trip: an in-process LRU in front of a
+# SQLite table that survives restarts. Empty intents and Ollama-fallback output
+# are never cached. AURAOS_SCRIPT_CACHE_TTL=0 disables the cache.
+SCRIPT_CACHE_TTL = int(os.environ.get("AURAOS_SCRIPT_CACHE_TTL", "3600"))
+SCRIPT_CACHE_SIZE = 1024
+
+class TTLCache:
+    """Thread-safe LRU whose entries expire ttl seconds after they were stored.
+
+    A ttl of 0 or less disables it: get() misses and put() is a no-op.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        if self.ttl <= 0:
+            return None
+        with self._lock:
+            hit = self._data.get(key)
+            if hit is None or hit[1] < time.time() - self.ttl:
+                self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return hit[0]
+
+    def put(self, key, value, ts=None):
+        if self.ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.time() if ts is None else ts)
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._data)}
+
+_script_cache = TTLCache(SCRIPT_CACHE_SIZE, SCRIPT_CACHE_TTL)
+_script_db_lock = threading.Lock()
+_script_db = None
+
+def _script_cache_key(provider, model, intent, cwd, windows):
+    raw = "\0".join((provider, model, intent, cwd, "|".join(sorted(map(str, windows)))))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+def _script_db_conn():
+    """Open the cache table on first use; callers hold _script_db_lock."""
+    global _script_db
+    if _script_db is None:
+        _script_db = sqlite3.connect(SCRIPT_CACHE_PATH, check_same_thread=False)
+        _script_db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, script TEXT, ts INTEGER)")
+    return _script_db
+
+def get_cached_script(key):
+    """Return the cached script dict for key, or None if missing or expired."""
+    if SCRIPT_CACHE_TTL <= 0:
+        return None
+    hit = _script_cache.get(key)
+    if hit is not None:
+        return hit
+    try:
+        with _script_db_lock:
+            row = _script_db_conn().execute("SELECT script, ts FROM cache WHERE key=?", (key,)).fetchone()
+        if row is None or row[1] < time.time() - SCRIPT_CACHE_TTL:
+            return None
+        script_data = ai_helper.loads_json(row[0])
+    except Exception as e:
+        logging.warning(f"[Script Cache] Lookup failed: {e}")
+        return None
+    _script_cache.put(key, script_data, row[1])
+    return script_data
+
+def put_cached_script(key, script_data):
+    if SCRIPT_CACHE_TTL <= 0:
+        return
+    now = int(time.time())
+    _script_cache.put(key, script_data, now)
+    try:
+        with _script_db_lock:
+            db = _script_db_conn()
+            db.execute("INSERT OR REPLACE INTO cache (key, script, ts) VALUES (?, ?, ?)",
+                       (key, json.dumps(script_data), now))
+            db.execute("DELETE FROM cache WHERE ts < ?", (now - SCRIPT_CACHE_TTL,))
+            db.commit()
+    except Exception as e:
+        # best-effort: a lost write only costs a model call later
+        logging.warning(f"[Script Cache] Store failed: {e}")
+
+@functools.lru_cache(maxsize=256)
+def format_windows(windows):
+    """Prompt text for a window list; clients resend the same list between calls."""
+    return "\n- " + "\n- ".join(windows) if windows else "No open windows detected."
+
 @app.route("/generate_script", methods=["POST"])
 def generate_script():
-    data = request.get_json(force=True)
+    return generate_script_for(request.get_json(force=True))
+
+def generate_script_for(data):
+    """Generate a script for data = {"intent": ..., "context": {...}}."""
     user_intent = data.get("intent", "")
     context = data.get("context", {})
     cwd = context.get("cwd", ".")
     windows = context.get("windows", [])
 
-    window_list_str = "\n- " + "\n- ".join(windows) if windows else "No open windows detected."
+    window_list_str = format_windows(tuple(windows))
     logging.info(f"[Script Gen] Intent: '{user_intent}'")
 
-    system_prompt = f"""
-    You are AuraOS's autonomous daemon. Generate either a Python or shell script based on the intent.
-    Self-modify if the request includes 'learn', 'add a feature', 'improve', or 'modify yourself'.
-
-    Return JSON: {{"script_type": "shell" or "python", "script": "..."}}
+    # An empty intent would share one key across unrelated requests
+    cache_key = None
+    if user_intent:
+        cache_key = _script_cache_key(ai_helper.active_provider(), ai_helper.DEFAULT_MODEL,
+                                      user_intent, cwd, windows)
+        cached = get_cached_script(cache_key)
+        if cached is not None:
+            logging.info("[Script Gen] Served from cache")
+            return _json_response(cached)
 
-    CONTEXT:
-    - CWD: {cwd}
-    - Open Windows: {window_list_str}
-    """
+    # Only the context varies per request; it goes after the fixed instructions
+    system_prompt = f"{SCRIPT_SYSTEM_PROMPT}CONTEXT:\n- CWD: {cwd}\n- Open Windows: {window_list_str}\n"
 
     # Centralized AI: try configured cloud provider (OpenRouter/OpenAI) and fall back to Ollama
     res = ai_helper.get_ai_response(user_intent, system_prompt=system_prompt)
@@ -88,8 +228,12 @@ def generate_script():
         match = re.search(r'\{.*\}', content, re.DOTALL)
         if not match:
             raise ValueError("No valid JSON found in LLM response.")
-        content = match.group(0)
-        return jsonify(json.loads(content)), 200
+        script_data = ai_helper.loads_json(match.group(0))
+        # Ollama fallback output is sampled, not deterministic; don't replay it
+        if (cache_key and res.get('provider') != 'ollama'
+                and isinstance(script_data, dict) and script_data.get("script")):
+            put_cached_script(cache_key, script_data)
+        return _json_response(script_data)
     except Exception as e:
         logging.error(f"[Script Gen] Error: {e}")
         return jsonify({"error": "Failed to generate script.", "details": str(e)}), 500
@@ -117,6 +261,84 @@ def is_malicious_script(script):
             return True
     return False
 
+def _discard_output(files, proc):
+    """Read and drop whatever the script or its children still write, then close the pipes.
+
+    Closing them right away would send SIGPIPE to a launched app on its next write.
+    """
+    with selectors.DefaultSelector() as sel:
+        for f in files:
+            sel.register(f, selectors.EVENT_READ)
+        while sel.get_map():
+            for key, _ in sel.select():
+                if not os.read(key.fd, 65536):
+                    sel.unregister(key.fileobj)
+                    key.fileobj.close()
+    proc.wait()
+
+def run_script(script, env):
+    """Run script through the shell, bounded by SCRIPT_TIMEOUT and SCRIPT_OUTPUT_LIMIT.
+
+    Returns (returncode, stdout, stderr, timed_out). Output is read as bytes and
+    only the last SCRIPT_OUTPUT_LIMIT bytes of each stream are kept and decoded.
+    The call returns once the shell exits, even if a child it put in the
+    background (firefox &) still holds the output pipes open.
+    """
+    # Own session, so the script is not tied to the daemon's terminal
+    proc = subprocess.Popen(script, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                            env=env, start_new_session=True)
+    bufs = {proc.stdout.fileno(): bytearray(), proc.stderr.fileno(): bytearray()}
+    truncated = set()
+    deadline = time.monotonic() + SCRIPT_TIMEOUT
+    with selectors.DefaultSelector() as sel:
+        sel.register(proc.stdout, selectors.EVENT_READ)
+        sel.register(proc.stderr, selectors.EVENT_READ)
+        exited = False
+        while sel.get_map():
+            if not exited and proc.poll() is not None:
+                # From here on only collect what is already buffered
+                exited = True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Wake up periodically to notice the shell exiting while pipes stay open
+            ready = sel.select(0 if exited else min(remaining, 0.1))
+            if exited and not ready:
+                break
+            for key, _ in ready:
+                chunk = os.read(key.fd, 65536)
+                if not chunk:
+                    sel.unregister(key.fileobj)
+                    continue
+                buf = bufs[key.fd]
+                buf += chunk
+                if len(buf) > SCRIPT_OUTPUT_LIMIT:
+                    del buf[:len(buf) - SCRIPT_OUTPUT_LIMIT]
+                    truncated.add(key.fd)
+        open_files = [key.fileobj for key in sel.get_map().values()]
+    timed_out = False
+    try:
+        proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        if not SCRIPT_KEEP_RUNNING:
+            try:
+                os.killpg(proc.pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            proc.wait()
+    outputs = []
+    for f in (proc.stdout, proc.stderr):
+        text = bufs[f.fileno()].decode("utf-8", "replace")
+        if f.fileno() in truncated:
+            text = f"[output truncated to the last {SCRIPT_OUTPUT_LIMIT} bytes]\n" + text
+        outputs.append(text)
+        if f not in open_files:
+            f.close()
+    if open_files:
+        threading.Thread(target=_discard_output, args=(open_files, proc), daemon=True).start()
+    return proc.returncode, outputs[0], outputs[1], timed_out
+
 @app.route("/execute_script", methods=["POST"])
 def execute_script():
     data = request.get_json(force=True)
@@ -132,19 +354,31 @@ def execute_script():
     if display:
         env["DISPLAY"] = display
     logging.warning(f"[Execution] Running script: {script}")
-    result = subprocess.run(script, shell=True, capture_output=True, text=True, env=env)
+    returncode, stdout, stderr, timed_out = run_script(script, env)
+    if timed_out:
+        logging.error(f"[Execution] Script timed out after {SCRIPT_TIMEOUT}s")
+        if SCRIPT_KEEP_RUNNING:
+            stderr += f"\nStopped waiting after {SCRIPT_TIMEOUT}s; the script is still running."
+        else:
+            stderr += f"\nScript killed after {SCRIPT_TIMEOUT}s."
     return jsonify({
-        "status": "success" if result.returncode == 0 else "error",
-        "return_code": result.returncode,
-        "output": result.stdout,
-        "error_output": result.stderr
+        "status": "success" if returncode == 0 else "error",
+        "return_code": returncode,
+        "output": stdout,
+        "error_output": stderr
     })
 
+def tail_log(max_bytes):
+    """Return the last max_bytes of the log without reading the whole file."""
+    with open(LOG_PATH, "rb") as log:
+        log.seek(0, os.SEEK_END)
+        log.seek(max(0, log.tell() - max_bytes))
+        return log.read().decode("utf-8", "replace")
+
 @app.route("/self_reflect", methods=["POST"])
 def self_reflect():
     try:
-        with open(LOG_PATH, "r") as log:
-            logs = log.read()[-5000:]
+        logs = tail_log(5000)
         with open(DAEMON_PATH, "r") as code:
             src = code.read()
 
@@ -167,8 +401,11 @@ def self_reflect():
             decoder = json.JSONDecoder()
             update, idx = decoder.raw_decode(content)
 
-            b64 = base64.b64encode(json.dumps(update).encode()).decode()
-            subprocess.run(["python3", UPDATER_PATH, b64], check=False)
+            # Hand the payload over as a private temp file; updater.py removes it
+            with tempfile.NamedTemporaryFile("wb", prefix="auraos-update-", suffix=".json",
+                                             dir=UPDATE_PAYLOAD_DIR, delete=False) as tf:
+                tf.write(json.dumps(update).encode("utf-8"))
+            subprocess.run(["python3", UPDATER_PATH, tf.name], check=False)
             return jsonify({"status": "update triggered"}), 200
         except json.JSONDecodeError as e:
             logging.error(f"[Self-Reflect] JSON parse error: {e}\nContent: {content}")
@@ -191,16 +428,36 @@ def periodic_self_reflect():
 
 threading.Thread(target=periodic_self_reflect, daemon=True).start()
 
+# Replies to repeated chat messages are answered from memory instead of
+# another model call. Keys include the provider and model, and only cloud
+# replies (requested at temperature 0) are stored; the Ollama fallback samples
+# at its default temperature. AURAOS_CHAT_CACHE_TTL=0 disables the cache.
+CHAT_CACHE_TTL = int(os.environ.get("AURAOS_CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_SIZE = 1024
+_chat_cache = TTLCache(CHAT_CACHE_SIZE, CHAT_CACHE_TTL)
+
+@app.route("/cache_stats", methods=["GET"])
+def cache_stats():
+    return jsonify({"chat": _chat_cache.stats(), "script": _script_cache.stats()}), 200
+
 # Conversational AI: Use a local model for simple Q&A/chat
 @app.route("/chat", methods=["POST"])
 def chat():
     data = request.get_json(force=True)
     user_message = data.get("message", "")
+    provider = ai_helper.active_provider()
+    cache_key = hashlib.sha256(
+        f"{provider}\0{ai_helper.DEFAULT_MODEL}\0{user_message}".encode("utf-8")).hexdigest()
+    cached = _chat_cache.get(cache_key)
+    if cached is not None:
+        return jsonify({"response": cached, "cached": True}), 200
     # Use centralized router for conversational responses (local preferred)
     # Try configured cloud provider first, then Ollama via ai_helper
     res = ai_helper.get_ai_response(user_message, system_prompt=None)
     if res.get('success') and res.get('response'):
         logging.info(f"[Chat] Used provider: {res.get('provider')}")
+        if res.get('provider') != 'ollama' and res.get('model') == ai_helper.DEFAULT_MODEL:
+            _chat_cache.put(cache_key, res.get('response'))
         return jsonify({"response": res.get('response')}), 200
     else:
         logging.warning(f"[Chat] AI call failed or empty: {res.get('error')}")
@@ -210,9 +467,17 @@ def chat():
 
 # Intent classification: decide if input is chat or task
 
+# Words that mark a request as a task; one compiled, case-insensitive pass
+# instead of lowercasing the input and scanning it once per word
+TASK_WORDS_RE = re.compile(
+    "|".join(["list", "top", "dataset", "script", "find", "scrape", "download",
+              "search", "generate", "feature", "improve", "add", "update"]),
+    re.IGNORECASE,
+)
+
 def classify_intent(user_input):
     # Simple heuristic: if question is short and not requesting a list, dataset, or script, treat as chat
-    if len(user_input.split()) < 12 and not any(word in user_input.lower() for word in ["list", "top", "dataset", "script", "find", "scrape", "download", "search", "generate", "feature", "improve", "add", "update"]):
+    if len(user_input.split()) < 12 and not TASK_WORDS_RE.search(user_input):
         return "chat"
     return "task"
 
@@ -235,9 +500,8 @@ def ai():
         response = local_conversational_ai(user_input)
         return jsonify({"type": "chat", "response": response})
     else:
-        # Forward to script generation logic
-        # Reuse generate_script logic
-        return generate_script()
+        # Forward to script generation logic with the input as the intent
+        return generate_script_for({"intent": user_input, "context": data.get("context", {})})
 
 if __name__ == "__main__":
     logging.info("Starting AuraOS AI Daemon v8.4...")
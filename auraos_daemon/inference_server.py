@@ -14,7 +14,7 @@ import base64
 import threading
 import time
 from pathlib import Path
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 from typing import Optional, Dict, Any
 
 # Configure logging
@@ -113,6 +113,33 @@ class OllamaBackend:
         except Exception as e:
             logger.error(f"Ollama generate failed: {e}")
             return ""
+    
+    def generate_stream(self, prompt: str, images: Optional[list] = None, **kwargs):
+        """Yield response text chunks as Ollama produces them"""
+        payload = {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True
+        }
+        if images:
+            payload["images"] = images
+            payload["format"] = "json"
+        
+        try:
+            with requests.post(f"{self.ollama_url}/api/generate", json=payload, timeout=120, stream=True) as resp:
+                if resp.status_code != 200:
+                    logger.error(f"Ollama error: {resp.status_code} {resp.text}")
+                    return
+                for line in resp.iter_lines():
+                    if not line:
+                        continue
+                    part = json.loads(line)
+                    if part.get("response"):
+                        yield part["response"]
+                    if part.get("done"):
+                        break
+        except Exception as e:
+            logger.error(f"Ollama stream failed: {e}")
 
 
 class TransformersBackend:
@@ -312,15 +339,24 @@ def ask():
     {
         "query": "describe what you see in the image",
         "images": ["base64_encoded_screenshot"],
-        "parse_json": True/False
+        "parse_json": True/False,
+        "stream": True/False (optional)
     }
     
+    or multipart/form-data with "query"/"parse_json" fields and one or more
+    raw "image" file parts (avoids base64 on the wire).
+    
+    Any other content type gets a 415.
+
     Returns:
     {
         "status": "success",
         "response": "...",
         "actions": [...] if parse_json
     }
+    
+    With stream=true (and a backend that supports it) the response is
+    application/x-ndjson instead: one {"response": "<chunk>"} object per line.
     """
     if not inference_backend:
         return jsonify({"status": "error", "error": "No backend initialized"}), 503
@@ -329,14 +365,31 @@ def ask():
         return jsonify({"status": "error", "error": "Model still loading"}), 503
     
     try:
-        data = request.json or {}
-        query = data.get("query", "")
-        images = data.get("images", [])
-        parse_json = data.get("parse_json", False)
+        if request.mimetype == "multipart/form-data":
+            query = request.form.get("query", "")
+            images = [base64.b64encode(f.read()).decode("ascii") for f in request.files.getlist("image")]
+            parse_json = request.form.get("parse_json", "false").lower() == "true"
+            stream = request.form.get("stream", "false").lower() == "true"
+        elif not request.is_json:
+            return jsonify({"status": "error", "error": f"Unsupported content type: {request.mimetype}"}), 415
+        else:
+            data = request.get_json(silent=True) or {}
+            query = data.get("query", "")
+            images = data.get("images", [])
+            parse_json = data.get("parse_json", False)
+            stream = data.get("stream", False)
         
         if not query:
             return jsonify({"status": "error", "error": "Missing query"}), 400
         
+        if stream and hasattr(inference_backend, "generate_stream"):
+            logger.info(f"Ask request (stream): query_len={len(query)}, images={len(images)}")
+            chunks = inference_backend.generate_stream(query, images=images if images else None)
+            return Response(
+                (json.dumps({"response": chunk}) + "\n" for chunk in chunks),
+                mimetype="application/x-ndjson"
+            )
+        
         logger.info(f"Ask request: query_len={len(query)}, images={len(images)}")
         
         response = inference_backend.generate(query, images=images if images else None)
@@ -1,18 +1,33 @@
 # updater.py
-import base64, json, subprocess, sys, os
+import base64, json, shutil, subprocess, sys, os
 
 def main():
     if len(sys.argv) != 2:
-        print("Usage: updater.py <base64_payload>")
+        print("Usage: updater.py <payload_file | base64_payload>")
         exit(1)
     try:
-        payload = json.loads(base64.b64decode(sys.argv[1]))
+        arg = sys.argv[1]
+        if os.path.isfile(arg):
+            with open(arg, "rb") as f:
+                payload = json.loads(f.read())
+            os.unlink(arg)
+        else:
+            payload = json.loads(base64.b64decode(arg))
         code = payload["code"]
         packages = payload.get("packages", [])
 
         print("[Updater] Installing packages:", packages)
-        for p in packages:
-            subprocess.run(["pip3", "install", p], check=False)
+        if packages:
+            # One resolver run for all packages; uv is much faster when installed
+            uv = shutil.which("uv")
+            if uv:
+                install = [uv, "pip", "install", "--python", sys.executable]
+            else:
+                install = ["pip3", "install"]
+            if subprocess.run([*install, *packages], check=False).returncode != 0:
+                # One bad name fails the whole batch; install the rest one by one
+                for pkg in packages:
+                    subprocess.run([*install, pkg], check=False)
 
         # Ensure git repo
         if not os.path.exists(".git"):
@@ -2,13 +2,20 @@ import tkinter as tk
 from tkinter import scrolledtext
 import subprocess
 import threading
+import queue
 import os
-import base64
+from concurrent.futures import ThreadPoolExecutor
+import binascii
 import json
 import time
 import io
 import re
+import shutil
+import hashlib
+from collections import OrderedDict
 import logging
+import logging.handlers
+import atexit
 import sys
 from pathlib import Path
 
@@ -40,13 +47,34 @@ except ImportError:
     requests = None
 
 try:
-    from PIL import Image, ImageChops, ImageDraw
+    import mss
+    HAS_MSS = True
+except ImportError:
+    HAS_MSS = False
+    mss = None
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+    orjson = None
+
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+    np = None
+
+# ImageChops/ImageDraw are only needed by the click-verification debug helper
+# and are imported lazily there
+try:
+    from PIL import Image
     HAS_PIL = True
 except ImportError:
     HAS_PIL = False
     Image = None
-    ImageChops = None
-    ImageDraw = None
 
 try:
     import pyautogui
@@ -63,14 +91,19 @@ except Exception as e:
 # Setup logging
 LOG_DIR = Path.home() / ".auraos" / "logs"
 LOG_DIR.mkdir(parents=True, exist_ok=True)
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler(LOG_DIR / "vision.log"),
-        logging.StreamHandler()
-    ]
-)
+# Capture/automation threads only enqueue records; one listener thread does
+# the file and stderr writes
+_log_formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+_log_handlers = [logging.FileHandler(LOG_DIR / "vision.log"), logging.StreamHandler()]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue = queue.Queue(-1)
+_log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
+# No formatter on the QueueHandler: the listener's handlers format each record
+logging.root.setLevel(logging.DEBUG)
+logging.root.addHandler(logging.handlers.QueueHandler(_log_queue))
 logger = logging.getLogger(__name__)
 
 def check_dependencies():
@@ -99,8 +132,140 @@ def get_inference_url():
     return "http://localhost:8081"
 
 INFERENCE_URL = get_inference_url()
+# Encoding for Analyze uploads: JPEG is much cheaper to encode and send;
+# set AURAOS_SCREENSHOT_FORMAT=PNG for text-heavy screens that need lossless
+SCREENSHOT_FORMAT = os.environ.get("AURAOS_SCREENSHOT_FORMAT", "JPEG").upper()
+JPEG_QUALITY = 85
+
+ANALYZE_PROMPT = "Describe what you see on this screen. Be concise. What is visible and what actions could be taken?"
+# Automation step prompt; only task and step vary between calls
+AUTOMATION_PROMPT = '''You are an AI assistant controlling a desktop computer. Your task:
+
+TASK: "{task}"
+
+RULES:
+1. You see the ENTIRE desktop - interact with applications OTHER than "AuraOS Vision"
+2. {frames_rule}
+3. Return a JSON array of 1 or 2 actions to run in order; use 2 only when the second
+   does not depend on seeing the result of the first
+4. Valid actions:
+   {{"action":"click","x":500,"y":300,"why":"reason for clicking here"}}
+   {{"action":"type","text":"hello","why":"reason for typing this"}}
+   {{"action":"done","why":"task completed successfully"}}
+   {{"action":"wait","why":"waiting for something to load"}}
+
+Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
+# The previous step's frame is only sent along with the current one when
+# AURAOS_AUTOMATION_PREV_FRAME=1: it doubles the image payload and prefill, and
+# single-image models (the default llava) may read x/y off the wrong frame
+AUTOMATION_PREV_FRAME = os.environ.get("AURAOS_AUTOMATION_PREV_FRAME", "0") == "1"
+AUTOMATION_FRAMES_RULE = (
+    "You get the previous screen (if any) followed by the CURRENT screen; x/y refer to the LAST image"
+    if AUTOMATION_PREV_FRAME else
+    "You get a screenshot of the CURRENT screen; x/y refer to it"
+)
+JSON_HEADERS = {'Content-Type': 'application/json'}
+# Candidate starts of a JSON object or array embedded in model output
+JSON_START = re.compile(r'[\[{]')
+JSON_DECODER = json.JSONDecoder()
+
+def dumps_json(obj):
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode('utf-8')
+
+def loads_json(data):
+    """Parse JSON from bytes/str, using orjson when available."""
+    if HAS_ORJSON:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def downscale(image, max_edge):
+    """Shrink image so its long edge is at most max_edge; returns (image, scale).
+
+    reducing_gap lets Pillow do a cheap integer box reduction first and run the
+    bilinear filter only over the last <2x step, which is several times faster
+    than a full bilinear pass from 4K while keeping text legible (unlike NEAREST).
+    """
+    scale = min(max_edge / max(image.size), 1.0)
+    if scale < 1.0:
+        w, h = image.size
+        image = image.resize((int(w * scale), int(h * scale)), Image.BILINEAR, reducing_gap=2.0)
+    return image, scale
+
+def diff_bbox(before, after):
+    """Bounding box (left, upper, right, lower) of pixels that differ, or None.
+
+    Uses vectorized NumPy comparisons when available, otherwise ImageChops.
+    """
+    if HAS_NUMPY:
+        changed = np.asarray(before) != np.asarray(after)
+        if changed.ndim == 3:
+            changed = changed.any(axis=2)
+        rows = changed.any(axis=1)
+        if not rows.any():
+            return None
+        cols = changed.any(axis=0)
+        top = int(rows.argmax())
+        bottom = len(rows) - int(rows[::-1].argmax())
+        left = int(cols.argmax())
+        right = len(cols) - int(cols[::-1].argmax())
+        return (left, top, right, bottom)
+    
+    from PIL import ImageChops
+    return ImageChops.difference(before, after).convert('L').getbbox()
+
+def iter_ask_body(query, images, parse_json=False, stream=False, chunk_size=64 * 1024):
+    """Yield an /ask JSON body in chunks.
+
+    Each of images is either a base64 str or raw image bytes (any buffer). A base64 str is
+    streamed slice by slice so it is never copied into a second full-size bytes
+    object; raw bytes are base64-encoded slice by slice, so no full-size base64
+    copy exists at all. Base64 needs no JSON escaping.
+    """
+    yield (b'{"query":' + dumps_json(query)
+           + b',"parse_json":' + (b'true' if parse_json else b'false')
+           + b',"stream":' + (b'true' if stream else b'false')
+           + b',"images":[')
+    for n, image in enumerate(images):
+        yield b'"' if n == 0 else b'","'
+        if isinstance(image, str):
+            for i in range(0, len(image), chunk_size):
+                yield image[i:i + chunk_size].encode('ascii')
+        else:
+            # Slices are a multiple of 3 bytes so the pieces concatenate without padding
+            view = memoryview(image)
+            step = chunk_size // 4 * 3
+            for i in range(0, len(view), step):
+                yield binascii.b2a_base64(view[i:i + step], newline=False)
+    yield b'"]}' if images else b']}'
 
 class AuraOSVision:
+    # Output log is trimmed from the front once it grows past MAX_OUTPUT_LINES
+    MAX_OUTPUT_LINES = 2000
+    TRIM_TO_LINES = 1500
+    # Queued output is flushed into the Text widget on the Tk thread at ~30Hz
+    UI_DRAIN_MS = 33
+    # Local "still loading" detection: frames are compared as small grayscale
+    # thumbnails; if less than FRAME_UNCHANGED_RATIO of pixels changed after a
+    # wait, wait again locally (up to MAX_LOCAL_WAITS) without asking the model
+    FRAME_DIFF_SIZE = (64, 36)
+    FRAME_UNCHANGED_RATIO = 0.01
+    MAX_LOCAL_WAITS = 3
+    # Vision models resize internally; don't upload more than this on the long edge
+    MAX_EDGE = 1024
+    # Automation steps upload a JPEG no larger than this on the long edge; the
+    # model's click coordinates are scaled back up to screen pixels
+    AUTOMATION_MAX_EDGE = 1280
+    AUTOMATION_JPEG_QUALITY = 75
+    # Each model call may plan up to this many actions, run back to back with cooldowns
+    AUTOMATION_ACTIONS_PER_STEP = 2
+    # Per-keystroke delay for xdotool typing (pyautogui sleeps 50ms per key)
+    XDOTOOL_TYPE_DELAY_MS = 12
+    # Analysis results remembered per (screenshot hash, question)
+    ANALYSIS_CACHE_SIZE = 32
+    
     def __init__(self, root):
         self.root = root
         self.root.title("AuraOS Vision")
@@ -109,14 +274,51 @@ class AuraOSVision:
         self.root.resizable(True, True)
         
         self.is_processing = False
-        self.screenshot_data = None
+        self.screenshot_bytes = None
+        self.screenshot_mime = None
+        self.screenshot_data = None  # base64 of screenshot_bytes, built only when needed
+        self._screenshot_hash = None
+        self._last_frame_key = None
+        self._analysis_cache = OrderedDict()
         self.screenshot_size = None
         self.automation_running = False
         self.last_action_type = None
+        # Output written from any thread; only the Tk thread touches the widget
+        self._ui_queue = queue.Queue()
+        # Widget updates requested by worker threads, run by the same drain tick
+        self._ui_calls = queue.Queue()
+        self._prev_frame = None
+        self._waits_since_last_model_call = 0
+        
+        # Single background worker for capture and analyze requests; callers
+        # chain on the returned Future instead of polling. is_processing keeps
+        # at most one job in flight.
+        self._io_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vision-io")
+        self._sct = None
+        self._monitor = None
+        self._img_buf = io.BytesIO()
+        # Automation steps run on their own thread, so they get their own buffer
+        self._auto_buf = io.BytesIO()
+        # Window that was active before the pointer entered this one; clicking
+        # our buttons focuses Vision itself, so it's remembered on <Enter>
+        self._target_window = None
+        
+        # Keep-alive session shared by Analyze and automation steps
+        self.session = None
+        if HAS_REQUESTS:
+            self.session = requests.Session()
+            self.session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=4))
+            # Open the pooled connection now so the first Analyze doesn't pay for it
+            threading.Thread(target=self._warm_connection, daemon=True).start()
+        # Post raw image bytes as multipart until the server says it can't take them
+        self._ask_multipart = True
         
         # Set DISPLAY for VM - prefer :0 over :99
         if "DISPLAY" not in os.environ:
             os.environ["DISPLAY"] = ":0"
+        # Resolved once: the environment and PATH don't change while we run
+        self._subproc_env = {**os.environ, "DISPLAY": os.environ.get("DISPLAY", ":0")}
+        self._xdotool_path = shutil.which('xdotool')
         
         # Check dependencies early
         check_dependencies()
@@ -125,6 +327,9 @@ class AuraOSVision:
         logger.info("Dependencies - PIL: %s, pyautogui: %s, requests: %s", HAS_PIL, HAS_PYAUTOGUI, HAS_REQUESTS)
         
         self.setup_ui()
+        self.root.protocol('WM_DELETE_WINDOW', self._on_close)
+        self.root.after(self.UI_DRAIN_MS, self._drain_ui_queue)
+        self.root.bind('<Enter>', self._remember_active_window)
         
         # Vision is a sidebar utility window - let it be a normal window
         # Don't try to make it desktop type or it gets hidden behind everything
@@ -181,6 +386,15 @@ class AuraOSVision:
         )
         self.clear_btn.pack(side='left')
         
+        # Capture only the window the user was last in (needs xdotool)
+        self.focus_only = tk.BooleanVar(value=False)
+        self.focus_check = tk.Checkbutton(
+            btn_frame, text="Window", variable=self.focus_only,
+            bg='#0a0e27', fg='#9cdcfe', selectcolor='#1a1f3c',
+            activebackground='#0a0e27', font=('Arial', 9)
+        )
+        self.focus_check.pack(side='left', padx=(5, 0))
+        
         # Output area
         output_frame = tk.Frame(self.root, bg='#0a0e27')
         output_frame.pack(fill='both', expand=True, padx=10, pady=5)
@@ -252,17 +466,107 @@ class AuraOSVision:
         )
         self.auto_status.pack(side='bottom', pady=5)
     
+    def _warm_connection(self):
+        """Establish the keep-alive connection to the inference server"""
+        try:
+            self.session.get(f"{INFERENCE_URL}/health", timeout=2)
+        except Exception as e:
+            logger.debug("Inference server warm-up failed: %s", e)
+    
+    def _on_close(self):
+        """Release capture resources and close the window"""
+        self.automation_running = False
+        self._io_pool.shutdown(wait=False, cancel_futures=True)
+        if self._sct is not None:
+            try:
+                self._sct.close()
+            except Exception:
+                pass
+        self.root.destroy()
+    
+    def _remember_active_window(self, event):
+        """Record the active X window as the focused-capture target"""
+        if event.widget is not self.root or self._xdotool_path is None:
+            return
+        try:
+            result = subprocess.run(
+                [self._xdotool_path, 'getactivewindow'], env=self._subproc_env,
+                capture_output=True, text=True, timeout=1
+            )
+            wid = result.stdout.strip()
+            if result.returncode == 0 and wid:
+                own = {self.root.winfo_id(), int(self.root.wm_frame(), 16)}
+                if int(wid) not in own:
+                    self._target_window = wid
+        except Exception as e:
+            logger.debug("Active window lookup failed: %s", e)
+    
+    def _window_region(self, window_id):
+        """Screen region {'left','top','width','height'} of an X window, or None"""
+        try:
+            result = subprocess.run(
+                [self._xdotool_path, 'getwindowgeometry', '--shell', window_id],
+                env=self._subproc_env, capture_output=True, text=True, timeout=2
+            )
+            if result.returncode != 0:
+                return None
+            geo = dict(line.split('=', 1) for line in result.stdout.split() if '=' in line)
+            return {'left': int(geo['X']), 'top': int(geo['Y']),
+                    'width': int(geo['WIDTH']), 'height': int(geo['HEIGHT'])}
+        except Exception as e:
+            logger.debug("Window geometry lookup failed: %s", e)
+            return None
+    
     def _clear_placeholder(self, event):
         if self.task_entry.get() == "Describe task for AI...":
             self.task_entry.delete(0, 'end')
         
     def append_text(self, text, tag='info'):
-        """Append text to output area"""
-        self.output_area.config(state='normal')
-        self.output_area.insert(tk.END, text, tag)
-        self.output_area.see(tk.END)
-        self.output_area.config(state='disabled')
-        self.root.update_idletasks()
+        """Queue text for the output area (safe to call from worker threads)"""
+        self._ui_queue.put((text, tag))
+    
+    def call_in_ui(self, func, *args):
+        """Run func(*args) on the Tk thread at the next drain tick (safe from worker threads)"""
+        self._ui_calls.put((func, args))
+    
+    def _show_ready(self):
+        """Reset the status line and Analyze button after a background job"""
+        self.status_label.config(text="Ready", fg='#6db783')
+        self.analyze_btn.config(state='normal')
+    
+    def _drain_ui_queue(self):
+        """Flush all queued output in one pass, then re-arm"""
+        items = []
+        try:
+            while True:
+                items.append(self._ui_queue.get_nowait())
+        except queue.Empty:
+            pass
+        if items:
+            self.output_area.config(state='normal')
+            for text, tag in items:
+                self.output_area.insert(tk.END, text, tag)
+            
+            # Keep the Text widget bounded so inserts don't degrade to O(n);
+            # checked once per tick rather than after every line
+            lines = int(self.output_area.index('end-1c').split('.')[0])
+            if lines > self.MAX_OUTPUT_LINES:
+                self.output_area.delete('1.0', f'{lines - self.TRIM_TO_LINES}.0')
+            
+            # One scroll per tick rather than one reflow per line
+            self.output_area.see(tk.END)
+            self.output_area.config(state='disabled')
+        
+        try:
+            while True:
+                func, args = self._ui_calls.get_nowait()
+                try:
+                    func(*args)
+                except Exception:
+                    logger.exception("UI callback failed")
+        except queue.Empty:
+            pass
+        self.root.after(self.UI_DRAIN_MS, self._drain_ui_queue)
         
     def clear_output(self):
         """Clear output area"""
@@ -272,82 +576,192 @@ class AuraOSVision:
         self.append_text("[Cleared]\n", "info")
         
     def take_screenshot(self):
-        """Take a screenshot"""
+        """Take a screenshot, returning the capture Future (or None if not started)"""
         if self.is_processing:
-            return
+            return None
         
         if not HAS_PIL:
             self.append_text("[Error] PIL not installed\n", "error")
-            return
+            return None
         
         if not HAS_PYAUTOGUI:
             self.append_text("[Error] pyautogui not installed\n", "error")
-            return
+            return None
             
         self.is_processing = True
         self.status_label.config(text="Capturing...", fg='#ffaa00')
         self.append_text("[+] Capturing...\n", "info")
         
-        threading.Thread(target=self._take_screenshot, daemon=True).start()
+        window_id = self._target_window if self.focus_only.get() else None
+        return self._io_pool.submit(self._take_screenshot, window_id)
         
-    def _take_screenshot(self):
-        """Take screenshot in background using scrot (most reliable method)"""
-        try:
-            # Use scrot directly - it's the most reliable method
-            temp_path = f"/tmp/auraos_vision_screenshot_{int(time.time())}.png"
+    def _grab_mss(self, region=None):
+        """Grab all monitors (or just region) via mss, reusing one instance across captures.
+
+        mss holds a per-thread X connection on Linux, so the instance is created
+        lazily on the capture worker thread that uses it.
+        """
+        if self._sct is None:
+            self._sct = mss.mss()
+            self._monitor = self._sct.monitors[0]
+        raw = self._sct.grab(region or self._monitor)
+        # Decode straight from the grabbed BGRA buffer instead of building the
+        # intermediate raw.rgb bytes. Only one screenshot is held at a time:
+        # the image must be encoded into screenshot_bytes before the next grab().
+        return Image.frombuffer('RGB', raw.size, raw.bgra, 'raw', 'BGRX', 0, 1)
+    
+    def _grab_screen(self):
+        """Full-desktop grab for automation steps: mss when available, else pyautogui.
+
+        Must run on the capture worker so the mss instance stays on its own thread.
+        """
+        if HAS_MSS:
+            try:
+                return self._grab_mss()
+            except Exception as e:
+                logger.warning("mss capture failed, falling back to pyautogui: %s", e)
+        return pyautogui.screenshot()
+    
+    def _grab_scrot(self):
+        """Grab the screen with scrot, falling back to pyautogui.
+
+        Returns (image, png_bytes); png_bytes is scrot's file content, or None
+        for the pyautogui fallback.
+        """
+        temp_path = f"/tmp/auraos_vision_screenshot_{int(time.time())}.png"
+        
+        result = subprocess.run(
+            ["scrot", temp_path],
+            capture_output=True,
+            timeout=5,
+            env=self._subproc_env
+        )
+        
+        if result.returncode != 0:
+            # If scrot fails, try pyautogui as fallback
+            try:
+                screenshot = pyautogui.screenshot()
+                self.append_text("[+] Using pyautogui fallback\n", "info")
+            except Exception as e:
+                raise Exception(f"Both scrot and pyautogui failed: {e}")
+            png_bytes = None
+        else:
+            # Load the screenshot from scrot
+            if not os.path.exists(temp_path):
+                raise Exception(f"scrot created no file at {temp_path}")
             
-            result = subprocess.run(
-                ["scrot", temp_path],
-                capture_output=True,
-                timeout=5,
-                env={**os.environ, "DISPLAY": os.environ.get("DISPLAY", ":99")}
-            )
+            # Keep the file bytes: they are already a valid PNG upload
+            with open(temp_path, 'rb') as f:
+                png_bytes = f.read()
+            screenshot = Image.open(io.BytesIO(png_bytes))
+            try:
+                os.unlink(temp_path)
+            except:
+                pass
+        return screenshot, png_bytes
+    
+    def _take_screenshot(self, window_id=None):
+        """Take screenshot in background (mss in-process grab, scrot as fallback)
+
+        With window_id, only that window's on-screen rectangle is captured.
+        """
+        try:
+            region = self._window_region(window_id) if window_id else None
+            if window_id and region is None:
+                self.append_text("[+] Window not found, capturing full screen\n", "info")
             
-            if result.returncode != 0:
-                # If scrot fails, try pyautogui as fallback
+            screenshot = None
+            png_bytes = None
+            if HAS_MSS:
                 try:
-                    screenshot = pyautogui.screenshot()
-                    self.append_text("[+] Using pyautogui fallback\n", "info")
+                    screenshot = self._grab_mss(region)
                 except Exception as e:
-                    raise Exception(f"Both scrot and pyautogui failed: {e}")
-            else:
-                # Load the screenshot from scrot
-                if not os.path.exists(temp_path):
-                    raise Exception(f"scrot created no file at {temp_path}")
-                
-                screenshot = Image.open(temp_path)
-                try:
-                    os.unlink(temp_path)
-                except:
-                    pass
+                    logger.warning("mss capture failed, falling back to scrot: %s", e)
+            if screenshot is None:
+                screenshot, png_bytes = self._grab_scrot()
+                if region:
+                    png_bytes = None
+                    screenshot = screenshot.crop((region['left'], region['top'],
+                                                  region['left'] + region['width'],
+                                                  region['top'] + region['height']))
             
-            self.screenshot_size = screenshot.size
-            img_byte_arr = io.BytesIO()
-            screenshot.save(img_byte_arr, format='PNG')
-            img_byte_arr.seek(0)
-            self.screenshot_data = base64.b64encode(img_byte_arr.getvalue()).decode()
+            size = screenshot.size
+            screenshot, scale = downscale(screenshot, self.MAX_EDGE)
             
-            msg = f"[OK] Captured {screenshot.size[0]}x{screenshot.size[1]}"
+            # Identical pixels, size and region as the last capture - keep the
+            # previous encoding (and its analysis cache entry) instead of
+            # re-encoding. Only an exact match counts: any changed pixel means
+            # a new upload and a new analysis.
+            region_key = tuple(sorted(region.items())) if region else None
+            frame_key = (size, region_key,
+                         hashlib.blake2b(screenshot.tobytes(), digest_size=16).digest())
+            if self.screenshot_bytes is not None and frame_key == self._last_frame_key:
+                screenshot.close()
+                # The automation loop may have changed it since the last capture
+                self.screenshot_size = size
+                msg = f"[OK] Screen unchanged ({size[0]}x{size[1]})"
+                self.append_text(f"{msg}\n", "success")
+                logger.info(msg)
+                return
+            
+            if png_bytes is not None and scale == 1.0 and SCREENSHOT_FORMAT == 'PNG':
+                # scrot's file is already the PNG we would produce - don't re-encode it
+                self.screenshot_bytes = png_bytes
+                self.screenshot_mime = 'image/png'
+            else:
+                # Reuse one encode buffer across captures; screenshot_bytes gets its own copy
+                buf = self._img_buf
+                buf.seek(0)
+                buf.truncate()
+                if SCREENSHOT_FORMAT == 'JPEG':
+                    if screenshot.mode != 'RGB':
+                        screenshot = screenshot.convert('RGB')
+                    screenshot.save(buf, format='JPEG', quality=JPEG_QUALITY, optimize=False)
+                    self.screenshot_mime = 'image/jpeg'
+                else:
+                    screenshot.save(buf, format='PNG')
+                    self.screenshot_mime = 'image/png'
+                self.screenshot_bytes = buf.getvalue()
+            # Drop the decoded frame now rather than when this worker next runs
+            screenshot.close()
+            screenshot = None
+            self.screenshot_data = None
+            self._screenshot_hash = hashlib.blake2b(self.screenshot_bytes, digest_size=16).digest()
+            # Size and key only change together with the bytes they describe
+            self.screenshot_size = size
+            self._last_frame_key = frame_key
+            
+            msg = f"[OK] Captured {self.screenshot_size[0]}x{self.screenshot_size[1]}"
             self.append_text(f"{msg}\n", "success")
             logger.info(msg)
         except Exception as e:
             err_msg = f"[Error] Screenshot: {e}"
             self.append_text(f"{err_msg}\n", "error")
             logger.error(err_msg, exc_info=True)
-            
-        self.is_processing = False
-        self.status_label.config(text="Ready", fg='#6db783')
+        finally:
+            self.is_processing = False
+            self.call_in_ui(self._show_ready)
         
     def analyze(self):
         """Analyze screenshot with AI"""
         if self.is_processing:
             return
         
-        # Auto-capture if needed
-        if not self.screenshot_data:
+        # Auto-capture if needed, then continue as soon as the capture finishes
+        if not self.screenshot_bytes:
             self.append_text("📷 Auto-capturing...\n", "info")
-            self.take_screenshot()
-            self.root.after(1500, self.analyze)
+            fut = self.take_screenshot()
+            if fut is not None:
+                fut.add_done_callback(lambda f: self.call_in_ui(self._analyze_after_capture))
+            return
+        
+        # Same screenshot, same question - answer from the cache without a round-trip
+        cache_key = (self._screenshot_hash, ANALYZE_PROMPT)
+        cached = self._analysis_cache.get(cache_key)
+        if cached is not None:
+            self._analysis_cache.move_to_end(cache_key)
+            self.append_text(f"\n[AI] {cached}\n\n", "ai")
+            logger.info("Analysis served from cache")
             return
         
         if not HAS_REQUESTS:
@@ -358,33 +772,95 @@ class AuraOSVision:
         self.status_label.config(text="Analyzing...", fg='#00d4ff')
         self.analyze_btn.config(state='disabled')
         
-        threading.Thread(target=self._analyze, daemon=True).start()
+        self._io_pool.submit(self._analyze)
+        
+    def _analyze_after_capture(self):
+        """Resume analyze() once an auto-capture has completed"""
+        # Capture failed - the error is already shown, don't loop back into another capture
+        if not self.screenshot_bytes:
+            return
+        self.analyze()
         
+    def _post_ask(self, query, stream=False):
+        """POST the current screenshot and query to /ask.
+
+        Raw image bytes go up as multipart/form-data (no base64 inflation on the
+        wire). If the server rejects that, fall back to the streamed base64 JSON
+        body and stay on JSON for the rest of the session. With stream=True the
+        server may answer with NDJSON chunks; the response body is not preloaded.
+        """
+        if self._ask_multipart:
+            response = self.session.post(
+                f"{INFERENCE_URL}/ask",
+                files={'image': ('screenshot', self.screenshot_bytes, self.screenshot_mime)},
+                data={'query': query, 'parse_json': 'false', 'stream': 'true' if stream else 'false'},
+                timeout=60,
+                stream=stream
+            )
+            # Only a content-type rejection means the server can't take multipart;
+            # anything else (a 500 from the model, say) is returned as is
+            if response.status_code not in (400, 415):
+                return response
+            response.close()
+            logger.warning("Server rejected multipart /ask (%d), using JSON", response.status_code)
+            self._ask_multipart = False
+        
+        if self.screenshot_data is None:
+            self.screenshot_data = binascii.b2a_base64(self.screenshot_bytes, newline=False).decode('ascii')
+        # Sent with chunked transfer encoding
+        return self.session.post(
+            f"{INFERENCE_URL}/ask",
+            data=iter_ask_body(query, [self.screenshot_data], stream=stream),
+            headers=JSON_HEADERS,
+            timeout=60,
+            stream=stream
+        )
+    
+    def _cache_analysis(self, key, analysis):
+        """Remember a non-empty analysis, evicting the least recently used entry.
+
+        Tk thread only, like the cache lookup; workers go through call_in_ui.
+        """
+        if not analysis:
+            return
+        self._analysis_cache[key] = analysis
+        self._analysis_cache.move_to_end(key)
+        if len(self._analysis_cache) > self.ANALYSIS_CACHE_SIZE:
+            self._analysis_cache.popitem(last=False)
+    
     def _analyze(self):
         """Analyze screenshot with AI"""
         try:
             self.append_text("🤖 Sending to AI...\n", "info")
             logger.debug("Starting analysis request to %s", INFERENCE_URL)
             
-            response = requests.post(
-                f"{INFERENCE_URL}/ask",
-                json={
-                    "query": "Describe what you see on this screen. Be concise. What is visible and what actions could be taken?",
-                    "images": [self.screenshot_data],
-                    "parse_json": False
-                },
-                timeout=60
-            )
+            cache_key = (self._screenshot_hash, ANALYZE_PROMPT)
+            response = self._post_ask(ANALYZE_PROMPT, stream=True)
             
-            if response.status_code == 200:
-                result = response.json()
-                analysis = result.get("response", "").strip()
-                self.append_text(f"\n[AI] {analysis}\n\n", "ai")
-                logger.info("Analysis completed successfully")
-            else:
-                err_msg = f"[Error] Server: {response.status_code}"
-                self.append_text(f"{err_msg}\n", "error")
-                logger.error(err_msg)
+            with response:
+                if response.status_code != 200:
+                    err_msg = f"[Error] Server: {response.status_code}"
+                    self.append_text(f"{err_msg}\n", "error")
+                    logger.error(err_msg)
+                elif response.headers.get('Content-Type', '').startswith('application/x-ndjson'):
+                    # Show tokens as they arrive instead of waiting for the full answer
+                    self.append_text("\n[AI] ", "ai")
+                    chunks = []
+                    for line in response.iter_lines():
+                        if line:
+                            chunk = loads_json(line).get("response", "")
+                            if chunk:
+                                chunks.append(chunk)
+                                self.append_text(chunk, "ai")
+                    self.append_text("\n\n", "ai")
+                    self.call_in_ui(self._cache_analysis, cache_key, "".join(chunks).strip())
+                    logger.info("Analysis completed successfully (streamed)")
+                else:
+                    result = loads_json(response.content)
+                    analysis = result.get("response", "").strip()
+                    self.append_text(f"\n[AI] {analysis}\n\n", "ai")
+                    self.call_in_ui(self._cache_analysis, cache_key, analysis)
+                    logger.info("Analysis completed successfully")
                 
         except requests.exceptions.ConnectionError as e:
             err_msg = f"[Error] Cannot reach {INFERENCE_URL}: {e}"
@@ -400,8 +876,7 @@ class AuraOSVision:
             logger.exception("Analysis exception")
             
         self.is_processing = False
-        self.status_label.config(text="Ready", fg='#6db783')
-        self.analyze_btn.config(state='normal')
+        self.call_in_ui(self._show_ready)
     
     def start_automation(self):
         """Start Cluely automation"""
@@ -415,6 +890,8 @@ class AuraOSVision:
             return
         
         self.automation_running = True
+        self._prev_frame = None
+        self._waits_since_last_model_call = 0
         self.start_auto_btn.config(state='disabled')
         self.stop_auto_btn.config(state='normal')
         self.auto_status.config(text="Automation: Running", fg='#00ff88')
@@ -430,48 +907,59 @@ class AuraOSVision:
         max_consecutive_errors = 3
         
         logger.info("Starting automation loop for task: %s", task)
+        prev_upload = None  # previous step's JPEG, kept only with AUTOMATION_PREV_FRAME
         
         while self.automation_running and step < max_steps:
             step += 1
             self.append_text(f"\n[Step {step}/{max_steps}]\n", "action")
             
             try:
-                # Capture full screen
-                screenshot = pyautogui.screenshot()
+                # Capture full screen on the capture worker (shares its mss instance)
+                screenshot = self._io_pool.submit(self._grab_screen).result()
                 self.screenshot_size = screenshot.size
                 
                 logger.debug("Full desktop captured: %dx%d", screenshot.size[0], screenshot.size[1])
                 self.append_text(f"[Screen] Captured: {screenshot.size[0]}x{screenshot.size[1]}\n", "info")
                 
-                buffer = io.BytesIO()
-                screenshot.save(buffer, format='PNG')
-                img_data = base64.b64encode(buffer.getvalue()).decode()
+                # Still waiting on something and nothing moved - skip the model round-trip
+                changed = self._frame_change_ratio(screenshot)
+                if (self.last_action_type == 'wait'
+                        and changed < self.FRAME_UNCHANGED_RATIO
+                        and self._waits_since_last_model_call < self.MAX_LOCAL_WAITS):
+                    self._waits_since_last_model_call += 1
+                    self.append_text("[Wait] Screen unchanged, waiting locally...\n", "info")
+                    logger.debug("Local wait %d (changed=%.4f)", self._waits_since_last_model_call, changed)
+                    time.sleep(1.0)
+                    continue
                 
-                # Improved automation prompt
-                prompt = f'''You are an AI assistant controlling a desktop computer. Your task:
-
-TASK: "{task}"
-
-RULES:
-1. You see the ENTIRE desktop - interact with applications OTHER than "AuraOS Vision"
-2. Return ONLY ONE JSON action per response
-3. Valid actions:
-   {{"action":"click","x":500,"y":300,"why":"reason for clicking here"}}
-   {{"action":"type","text":"hello","why":"reason for typing this"}}
-   {{"action":"done","why":"task completed successfully"}}
-   {{"action":"wait","why":"waiting for something to load"}}
-
-Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
+                screenshot, scale = downscale(screenshot, self.AUTOMATION_MAX_EDGE)
+                if screenshot.mode != 'RGB':
+                    screenshot = screenshot.convert('RGB')
+                # Reused across steps; every view of it is released once the POST returns
+                buffer = self._auto_buf
+                buffer.seek(0)
+                buffer.truncate()
+                screenshot.save(buffer, format='JPEG', quality=self.AUTOMATION_JPEG_QUALITY, optimize=False)
+                screenshot.close()
                 
-                response = requests.post(
-                    f"{INFERENCE_URL}/ask",
-                    json={
-                        "query": prompt,
-                        "images": [img_data],
-                        "parse_json": False
-                    },
-                    timeout=60
-                )
+                prompt = AUTOMATION_PROMPT.format(task=task, step=step, max_steps=max_steps,
+                                                  frames_rule=AUTOMATION_FRAMES_RULE)
+                
+                # base64 is produced chunk by chunk while the body is sent
+                upload = buffer.getbuffer()
+                frames = [upload] if prev_upload is None else [prev_upload, upload]
+                body = iter_ask_body(prompt, frames)
+                try:
+                    response = self.session.post(
+                        f"{INFERENCE_URL}/ask",
+                        data=body,
+                        headers=JSON_HEADERS,
+                        timeout=60
+                    )
+                finally:
+                    # Release every view of the upload buffer so it can be truncated next step
+                    body.close()
+                    upload.release()
                 
                 if response.status_code != 200:
                     err_msg = f"[Error] Server returned {response.status_code}"
@@ -481,53 +969,33 @@ Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
                     time.sleep(3)
                     continue
                 
-                ai_text = response.json().get('response', '{}')
+                self._waits_since_last_model_call = 0
+                if AUTOMATION_PREV_FRAME:
+                    prev_upload = buffer.getvalue()
+                ai_text = loads_json(response.content).get('response', '{}')
                 logger.debug("AI response: %s", ai_text[:150])
                 
-                # Parse JSON from response
-                action_data = self._parse_json_response(ai_text)
-                
-                action = action_data.get('action', 'wait')
-                why = action_data.get('why', '')
-                
-                self.append_text(f"[AI] {why}\n", "ai")
-                logger.info("Action: %s - %s", action, why)
-                
                 consecutive_errors = 0
                 
-                if action == 'done':
+                done = False
+                for action_data in self._parse_actions(ai_text)[:self.AUTOMATION_ACTIONS_PER_STEP]:
+                    if not self.automation_running:
+                        break
+                    action = self._execute_action(action_data, scale)
+                    if action == 'done':
+                        done = True
+                        break
+                    
+                    # Adaptive cooldown
+                    time.sleep(self._get_adaptive_cooldown(action))
+                    if action not in ('click', 'type'):
+                        # Waiting means the model wants to look again first
+                        break
+                
+                if done:
                     self.append_text("[Auto] Task Complete!\n", "success")
                     logger.info("Automation completed at step %d", step)
                     break
-                    
-                elif action == 'click':
-                    x, y = action_data.get('x', 0), action_data.get('y', 0)
-                    if self._validate_coordinates(x, y):
-                        self.append_text(f"[Click] ({x},{y})\n", "action")
-                        logger.info("Executing click at (%d, %d)", x, y)
-                        self._do_click(x, y)
-                        self.last_action_type = 'click'
-                    else:
-                        self.append_text(f"[Skip] Invalid coords: ({x},{y})\n", "error")
-                        logger.warning("Invalid coordinates: (%d, %d)", x, y)
-                        
-                elif action == 'type':
-                    text = action_data.get('text', '')
-                    if text:
-                        self.append_text(f"[Type] {text[:30]}...\n", "action")
-                        logger.info("Executing type: %s", text[:30])
-                        self._do_type(text)
-                        self.last_action_type = 'type'
-                    else:
-                        self.append_text("[Skip] Empty text\n", "error")
-                    
-                else:  # wait or unknown
-                    self.append_text("[Wait] Pausing...\n", "info")
-                    self.last_action_type = 'wait'
-                
-                # Adaptive cooldown
-                cooldown = self._get_adaptive_cooldown(action)
-                time.sleep(cooldown)
                 
             except requests.exceptions.Timeout:
                 err_msg = "[Error] AI timeout (60s)"
@@ -561,21 +1029,79 @@ Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
         
         self.automation_running = False
         logger.info("Automation loop ended at step %d", step)
-        self.root.after(0, self._reset_auto_ui)
+        self.call_in_ui(self._reset_auto_ui)
     
-    def _parse_json_response(self, text):
-        """Parse JSON from AI response with fallback"""
-        try:
-            # Try to find JSON object in response
-            json_match = re.search(r'\{[^}]+\}', text)
-            if json_match:
-                return json.loads(json_match.group())
+    def _execute_action(self, action_data, scale):
+        """Run one parsed model action; returns the action name"""
+        action = action_data.get('action', 'wait')
+        why = action_data.get('why', '')
+        
+        self.append_text(f"[AI] {why}\n", "ai")
+        logger.info("Action: %s - %s", action, why)
+        
+        if action == 'done':
+            pass
+            
+        elif action == 'click':
+            x, y = action_data.get('x', 0), action_data.get('y', 0)
+            if scale < 1.0:
+                # The model saw the downscaled upload
+                x, y = round(x / scale), round(y / scale)
+            if self._validate_coordinates(x, y):
+                self.append_text(f"[Click] ({x},{y})\n", "action")
+                logger.info("Executing click at (%d, %d)", x, y)
+                self._do_click(x, y)
+                self.last_action_type = 'click'
+            else:
+                self.append_text(f"[Skip] Invalid coords: ({x},{y})\n", "error")
+                logger.warning("Invalid coordinates: (%d, %d)", x, y)
+                
+        elif action == 'type':
+            text = action_data.get('text', '')
+            if text:
+                self.append_text(f"[Type] {text[:30]}...\n", "action")
+                logger.info("Executing type: %s", text[:30])
+                self._do_type(text)
+                self.last_action_type = 'type'
             else:
-                logger.warning("No JSON found in: %s", text[:80])
-                return {"action": "wait", "why": "no JSON"}
-        except json.JSONDecodeError as e:
-            logger.warning("JSON parse error: %s", e)
-            return {"action": "wait", "why": "parse error"}
+                self.append_text("[Skip] Empty text\n", "error")
+            
+        else:  # wait or unknown
+            self.append_text("[Wait] Pausing...\n", "info")
+            self.last_action_type = 'wait'
+        
+        return action
+    
+    def _frame_change_ratio(self, screenshot):
+        """Fraction of thumbnail pixels that changed since the previous frame (1.0 if no previous frame)"""
+        frame = screenshot.resize(self.FRAME_DIFF_SIZE).convert('L').tobytes()
+        prev, self._prev_frame = self._prev_frame, frame
+        if prev is None or len(prev) != len(frame):
+            return 1.0
+        changed = sum(1 for a, b in zip(prev, frame) if abs(a - b) > 8)
+        return changed / len(frame)
+    
+    def _parse_actions(self, text):
+        """Parse the list of actions from an AI response, falling back to a single wait"""
+        # Decode from each '[' or '{' in turn; raw_decode handles nested values
+        # and stops at the end of the first complete one
+        found = False
+        for match in JSON_START.finditer(text):
+            found = True
+            try:
+                obj, _ = JSON_DECODER.raw_decode(text, match.start())
+            except json.JSONDecodeError:
+                continue
+            if isinstance(obj, dict):
+                return [obj]
+            actions = [a for a in obj if isinstance(a, dict)]
+            if actions:
+                return actions
+        if found:
+            logger.warning("JSON parse error in: %s", text[:80])
+            return [{"action": "wait", "why": "parse error"}]
+        logger.warning("No JSON found in: %s", text[:80])
+        return [{"action": "wait", "why": "no JSON"}]
     
     def stop_automation(self):
         """Stop automation"""
@@ -607,7 +1133,7 @@ Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
     def _get_adaptive_cooldown(self, action_type):
         """Get cooldown based on action type"""
         cooldowns = {
-            'click': 1.5,
+            'click': 1.0,
             'type': 2.5,
             'wait': 1.0,
             'done': 0.5,
@@ -615,17 +1141,12 @@ Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
         }
         return cooldowns.get(action_type, cooldowns['default'])
     
-    def _check_xdotool(self):
-        """Check if xdotool is available"""
-        import shutil
-        return shutil.which('xdotool') is not None
-    
     def _do_click(self, x, y):
         """Execute click with fallback"""
         # Try pyautogui first
         if HAS_PYAUTOGUI:
             try:
-                pyautogui.moveTo(x, y, duration=0.1)
+                # click() moves the pointer itself; an animated moveTo only sleeps
                 pyautogui.click(x, y)
                 logger.debug("Click via pyautogui at (%d, %d)", x, y)
                 return True
@@ -633,17 +1154,14 @@ Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
                 logger.warning("pyautogui click failed: %s", e)
         
         # Fallback to xdotool
-        if not self._check_xdotool():
+        if self._xdotool_path is None:
             self.append_text("[Error] No click method available\n", "error")
             logger.error("Neither pyautogui nor xdotool available")
             return False
 
         try:
-            env = os.environ.copy()
-            env['DISPLAY'] = env.get('DISPLAY', ':0')
-            
-            cmd = ['xdotool', 'mousemove', str(x), str(y), 'click', '1']
-            result = subprocess.run(cmd, env=env, timeout=5, capture_output=True, text=True)
+            cmd = [self._xdotool_path, 'mousemove', str(x), str(y), 'click', '1']
+            result = subprocess.run(cmd, env=self._subproc_env, timeout=5, capture_output=True, text=True)
             
             if result.returncode == 0:
                 logger.debug("Click via xdotool at (%d, %d)", x, y)
@@ -660,44 +1178,49 @@ Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
             return False
     
     def _do_type(self, text):
-        """Execute typing with fallback"""
+        """Execute typing: one xdotool call when available, pyautogui as fallback"""
         if not text:
             return
-            
-        # Try pyautogui first
-        if HAS_PYAUTOGUI:
+        
+        # xdotool sends the whole string in one process with a short key delay.
+        # Once it has started it may have typed part of the text, so only a
+        # failure to launch falls back to pyautogui; retyping would duplicate input.
+        if self._xdotool_path is not None:
+            # Twice the nominal typing time, plus headroom for startup
+            timeout = 5 + 2 * len(text) * self.XDOTOOL_TYPE_DELAY_MS / 1000
             try:
-                pyautogui.write(text, interval=0.05)
-                logger.debug("Typed %d chars via pyautogui", len(text))
+                subprocess.run(
+                    [self._xdotool_path, 'type', '--clearmodifiers',
+                     '--delay', str(self.XDOTOOL_TYPE_DELAY_MS), text],
+                    env=self._subproc_env,
+                    timeout=timeout,
+                    capture_output=True,
+                    check=True
+                )
+                logger.debug("Typed %d chars via xdotool", len(text))
                 return True
-            except Exception as e:
-                logger.warning("pyautogui type failed: %s", e)
+            except OSError as e:
+                logger.warning("xdotool could not start, falling back to pyautogui: %s", e)
+            except subprocess.TimeoutExpired:
+                logger.error("xdotool type timed out after %.0fs", timeout)
+                return False
+            except subprocess.CalledProcessError as e:
+                logger.error("xdotool type failed (exit %d): %s", e.returncode,
+                             e.stderr.decode('utf-8', 'replace').strip())
+                return False
         
-        # Fallback to xdotool
-        if not self._check_xdotool():
+        # Fallback to pyautogui
+        if not HAS_PYAUTOGUI:
             self.append_text("[Error] No typing method available\n", "error")
-            logger.error("Neither pyautogui nor xdotool available")
+            logger.error("Neither xdotool nor pyautogui available")
             return False
             
         try:
-            env = os.environ.copy()
-            env['DISPLAY'] = env.get('DISPLAY', ':0')
-            
-            subprocess.run(
-                ['xdotool', 'type', '--clearmodifiers', text],
-                env=env,
-                timeout=10,
-                capture_output=True,
-                check=True
-            )
-            logger.debug("Typed %d chars via xdotool", len(text))
+            pyautogui.write(text, interval=0.05)
+            logger.debug("Typed %d chars via pyautogui", len(text))
             return True
-            
-        except subprocess.TimeoutExpired:
-            logger.error("xdotool type timeout")
-            return False
         except Exception as e:
-            logger.error("xdotool type error: %s", e)
+            logger.error("pyautogui type error: %s", e)
             return False
 
     def _verify_click_coordinates(self, x, y, save_prefix='/tmp/vision_click'):
@@ -706,19 +1229,18 @@ Current step {step}/{max_steps}. Respond with ONLY JSON, nothing else.'''
             if not HAS_PYAUTOGUI or not HAS_PIL:
                 return {"ok": False, "reason": "missing_dependencies"}
 
+            from PIL import ImageDraw
+
             before = pyautogui.screenshot()
             before.save(f"{save_prefix}_before.png")
 
-            pyautogui.moveTo(x, y, duration=0.1)
             pyautogui.click(x, y)
             time.sleep(0.5)
 
             after = pyautogui.screenshot()
             after.save(f"{save_prefix}_after.png")
 
-            # Compute difference
-            diff = ImageChops.difference(before, after).convert('L')
-            bbox = diff.getbbox()
+            bbox = diff_bbox(before, after)
 
             debug_img = after.copy()
             draw = ImageDraw.Draw(debug_img)
@@ -9,8 +9,13 @@ commands (like rm -rf or shell chaining) and requests confirmation when
 commands cannot be confidently classified as safe.
 """
 import os
+import re
 import json
 import shlex
+import time
+import hashlib
+import tempfile
+import threading
 import urllib.request
 import urllib.error
 import getpass
@@ -22,11 +27,63 @@ try:
 except Exception:
     requests = None
     _REQUESTS_AVAILABLE = False
+try:
+    import orjson
+    _ORJSON_AVAILABLE = True
+except Exception:
+    orjson = None
+    _ORJSON_AVAILABLE = False
 
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
 DEFAULT_MODEL = "gpt-3.5-turbo"
 
+# Sampling parameters shared by every ChatCompletions call
+_CHAT_PARAMS = {"temperature": 0.0, "max_tokens": 512}
+# OpenAI SDK clients by (api_key, base_url); each owns a connection pool
+_sdk_clients = {}
+
+# Interpreted requests are cached on disk so repeating a request (e.g. "open
+# firefox") skips the model round-trip; AURAOS_AI_CACHE_TTL=0 disables it
+AI_CACHE_TTL = int(os.environ.get("AURAOS_AI_CACHE_TTL", "3600"))
+_ai_cache = None
+_ai_cache_lock = threading.Lock()
+
+# Shared keep-alive session: repeated AI calls (the daemon calls these helpers
+# for every request) reuse pooled connections instead of reconnecting each time
+_SESSION = None
+if _REQUESTS_AVAILABLE:
+    _SESSION = requests.Session()
+    _SESSION.mount("http://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+    _SESSION.mount("https://", requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+
+def dumps_json(obj):
+    """Serialize obj to JSON bytes, using orjson when available."""
+    if _ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def loads_json(data):
+    """Parse JSON from bytes/str, using orjson when available."""
+    if _ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _message_content(j):
+    """Assistant text from a ChatCompletions response body, or None if it has another shape."""
+    try:
+        return j["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return None
+
+
+def active_provider():
+    """Cloud provider call_ai_system will use: PROVIDER env, then the key_store default."""
+    return os.environ.get("PROVIDER") or key_store.get_default_provider() or "openai"
+
 
 def call_ai_system(user_prompt, system_prompt=None, model=DEFAULT_MODEL, timeout=15):
     """Call OpenAI ChatCompletions API and return the assistant text.
@@ -55,14 +112,6 @@ def call_ai_system(user_prompt, system_prompt=None, model=DEFAULT_MODEL, timeout
         messages.append({"role": "system", "content": system_prompt})
     messages.append({"role": "user", "content": user_prompt})
 
-    payload = {
-        "model": model,
-        "messages": messages,
-        "temperature": 0.0,
-        "max_tokens": 512,
-    }
-
-    data = json.dumps(payload).encode("utf-8")
     # If provider is openrouter or openai, prefer using the OpenAI python SDK (openai.OpenAI)
     provider_l = provider.lower() if provider else "openai"
     if provider_l in ("openrouter", "openai"):
@@ -74,12 +123,14 @@ def call_ai_system(user_prompt, system_prompt=None, model=DEFAULT_MODEL, timeout
             if provider_l == "openrouter":
                 base_url = "https://openrouter.ai/api/v1"
 
-            client = _OpenAI(api_key=api_key, base_url=base_url)
+            # Reuse the client (and its keep-alive pool) while the key is unchanged
+            client = _sdk_clients.get((api_key, base_url))
+            if client is None:
+                client = _sdk_clients[(api_key, base_url)] = _OpenAI(api_key=api_key, base_url=base_url)
             response = client.chat.completions.create(
                 model=model,
-                messages=([{"role": "system", "content": system_prompt}] if system_prompt else []) + [{"role": "user", "content": user_prompt}],
-                temperature=0.0,
-                max_tokens=512,
+                messages=messages,
+                **_CHAT_PARAMS,
                 # NOTE: some SDKs may reject unknown kwargs; keep minimal
             )
             # SDK returns choices[0].message.content or choices[0].delta.content for streams
@@ -89,23 +140,39 @@ def call_ai_system(user_prompt, system_prompt=None, model=DEFAULT_MODEL, timeout
                 # Fallback to dict-style access
                 j = json.loads(response._response.text) if hasattr(response, "_response") else None
                 if j:
-                    return j.get("choices", [])[0].get("message", {}).get("content")
+                    return _message_content(j)
                 return None
         except Exception:
             # Fall back to direct HTTP POST below
             pass
 
-    # Fallback: generic HTTP POST to OpenAI-compatible endpoint (uses api_key)
+    data = dumps_json({"model": model, "messages": messages, **_CHAT_PARAMS})
+
+    # Fallback: generic HTTP POST to OpenAI-compatible endpoint (uses api_key).
+    # The pooled session keeps the TLS connection alive between calls.
+    if _REQUESTS_AVAILABLE:
+        try:
+            resp = _SESSION.post(
+                OPENAI_API_URL,
+                data=data,
+                headers={"Content-Type": "application/json", "Authorization": f"Bearer {api_key}"},
+                timeout=timeout,
+            )
+            resp.raise_for_status()
+            j = loads_json(resp.content)
+            return _message_content(j)
+        except Exception:
+            return None
+
     req = urllib.request.Request(OPENAI_API_URL, data=data, method="POST")
     req.add_header("Content-Type", "application/json")
     req.add_header("Authorization", f"Bearer {api_key}")
 
     try:
         with urllib.request.urlopen(req, timeout=timeout) as resp:
-            body = resp.read().decode("utf-8")
-            j = json.loads(body)
+            j = loads_json(resp.read())
             # Extract assistant content if present
-            return j.get("choices", [])[0].get("message", {}).get("content")
+            return _message_content(j)
     except Exception:
         return None
 
@@ -134,17 +201,17 @@ def get_ai_response(user_prompt, system_prompt=None, model=DEFAULT_MODEL, timeou
         messages.append({"role": "user", "content": user_prompt})
         payload = {"model": os.environ.get("OLLAMA_MODEL", "gemma:2b"), "messages": messages, "stream": False}
         if _REQUESTS_AVAILABLE:
-            resp = requests.post(ollama_url, json=payload, timeout=timeout)
+            resp = _SESSION.post(ollama_url, json=payload, timeout=timeout)
             resp.raise_for_status()
-            data = resp.json()
+            data = loads_json(resp.content)
         else:
             # Fallback to urllib
             import urllib.request as _ur
-            data_bytes = json.dumps(payload).encode('utf-8')
+            data_bytes = dumps_json(payload)
             req = _ur.Request(ollama_url, data=data_bytes, method='POST')
             req.add_header('Content-Type', 'application/json')
             with _ur.urlopen(req, timeout=timeout) as r:
-                data = json.loads(r.read().decode('utf-8'))
+                data = loads_json(r.read())
         return {"success": True, "provider": "ollama", "response": data.get("message", {}).get("content"), "model": payload["model"], "error": None}
     except Exception as e:
         # Both cloud and ollama failed
@@ -155,6 +222,107 @@ def get_ai_response(user_prompt, system_prompt=None, model=DEFAULT_MODEL, timeou
         return {"success": False, "provider": None, "response": None, "model": None, "error": err}
 
 
+def _ai_cache_path():
+    return os.path.join(os.path.dirname(key_store.get_store_path()), "ai_cache.json")
+
+
+def _load_ai_cache():
+    """Load the interpretation cache once per process."""
+    global _ai_cache
+    if _ai_cache is None:
+        try:
+            with open(_ai_cache_path(), "r", encoding="utf-8") as f:
+                _ai_cache = json.load(f)
+        except Exception:
+            _ai_cache = None
+        if not isinstance(_ai_cache, dict):
+            # missing, unreadable or not an object: start over
+            _ai_cache = {}
+    return _ai_cache
+
+
+def _valid_cache_entry(entry, cutoff):
+    """True for a well-formed cache entry newer than cutoff."""
+    return (isinstance(entry, dict) and "value" in entry
+            and isinstance(entry.get("ts"), (int, float)) and entry["ts"] > cutoff)
+
+
+def _save_ai_cache():
+    """Write the cache atomically with 0o600 permissions, dropping expired entries.
+
+    Entries another process wrote since we loaded are merged in first so
+    they are not overwritten.
+    """
+    cutoff = time.time() - AI_CACHE_TTL
+    path = _ai_cache_path()
+    try:
+        with _ai_cache_lock:
+            cache = _load_ai_cache()
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    on_disk = json.load(f)
+            except Exception:
+                on_disk = {}
+            if isinstance(on_disk, dict):
+                for k, v in on_disk.items():
+                    if _valid_cache_entry(v, cutoff) and not (
+                            _valid_cache_entry(cache.get(k), cutoff) and cache[k]["ts"] >= v["ts"]):
+                        cache[k] = v
+            # prune in place so the in-memory cache stays bounded too
+            for k in [k for k, v in cache.items() if not _valid_cache_entry(v, cutoff)]:
+                del cache[k]
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".ai_cache.")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(cache, f)
+                os.replace(tmp, path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
+    except Exception:
+        # best-effort: a lost cache write only costs a model call later
+        pass
+
+
+# System prompt for interpret_request_to_json, built once at import
+_INTERPRET_SYSTEM_PROMPT = (
+    "You are an assistant that converts short user automation requests into a single safe shell command. "
+    "Respond ONLY with a JSON object with keys: action, command (optional), explanation, confirm_required. "
+    "action must be one of: run_command, advice, ask_user. "
+    "If generating a command, prefer simple, single-program commands without shell operators like &&, ;, |, >. "
+    "If the command might be destructive (file deletion, format, network access), set confirm_required to true."
+)
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_first_json(text):
+    """Return the first JSON object in text, or None.
+
+    A reply that is exactly one object is parsed directly. Otherwise decoding
+    starts at each '{' in turn and stops at the end of the first complete
+    object, so trailing prose after it doesn't make the parse fail.
+    """
+    stripped = text.strip()
+    if stripped.startswith('{') and stripped.endswith('}'):
+        try:
+            obj = loads_json(stripped)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+    start = text.find('{')
+    while start != -1:
+        try:
+            obj, _ = _JSON_DECODER.raw_decode(text, start)
+            if isinstance(obj, dict):
+                return obj
+        except ValueError:
+            pass
+        start = text.find('{', start + 1)
+    return None
+
+
 def interpret_request_to_json(request_text):
     """Ask the AI to interpret a natural language request and return JSON.
 
@@ -165,29 +333,34 @@ def interpret_request_to_json(request_text):
 
     If AI cannot be called, fall back to a very small heuristic parser.
     """
-    system = (
-        "You are an assistant that converts short user automation requests into a single safe shell command. "
-        "Respond ONLY with a JSON object with keys: action, command (optional), explanation, confirm_required. "
-        "action must be one of: run_command, advice, ask_user. "
-        "If generating a command, prefer simple, single-program commands without shell operators like &&, ;, |, >. "
-        "If the command might be destructive (file deletion, format, network access), set confirm_required to true."
-    )
+
+    cache_key = None
+    if AI_CACHE_TTL > 0:
+        cache_key = hashlib.sha256("\0".join((active_provider(), DEFAULT_MODEL, _INTERPRET_SYSTEM_PROMPT,
+                                               request_text)).encode("utf-8")).hexdigest()
+        hit = _load_ai_cache().get(cache_key)
+        if _valid_cache_entry(hit, time.time() - AI_CACHE_TTL):
+            return hit["value"], hit.get("provider")
 
     # Use the centralized get_ai_response so provider selection and fallback are consistent
-    res = get_ai_response(request_text, system_prompt=system)
+    res = get_ai_response(request_text, system_prompt=_INTERPRET_SYSTEM_PROMPT)
     provider = res.get('provider') if isinstance(res, dict) else None
     ai_response = res.get('response') if isinstance(res, dict) else None
     if ai_response:
         # Try to extract JSON from the AI response
         try:
-            # Find first { ... }
-            start = ai_response.find('{')
-            if start != -1:
-                json_part = ai_response[start:]
-                parsed = json.loads(json_part)
-                return parsed, provider
+            parsed = _extract_first_json(ai_response)
         except Exception:
-            pass
+            parsed = None
+        if parsed is not None:
+            # local Ollama replies are cheap to regenerate and may be a fallback
+            # answer for a cloud key, so only cloud replies are cached
+            if cache_key and provider != "ollama":
+                # cache I/O is best-effort and must never cost us the parsed answer
+                with _ai_cache_lock:
+                    _load_ai_cache()[cache_key] = {"ts": time.time(), "value": parsed, "provider": provider}
+                _save_ai_cache()
+            return parsed, provider
 
     # Fallback heuristic
     rt = request_text.lower()
@@ -203,6 +376,19 @@ def interpret_request_to_json(request_text):
     # Default: ask user for clarification
     return {"action": "ask_user", "explanation": "I couldn't confidently map that request to a safe automated action. Please rephrase or provide more details.", "confirm_required": True}, None
 
+# is_command_safe scans a command once per list instead of once per token
+_DISALLOWED_TOKENS = ("rm", "shutdown", "reboot", "init 0", ":(){", "mkfs", "dd ")
+_CHAINING_TOKENS = (";", "&&", "|", "$(", "`")
+_DISALLOWED_RE = re.compile("|".join(re.escape(t) for t in _DISALLOWED_TOKENS))
+_CHAINING_RE = re.compile("|".join(re.escape(t) for t in _CHAINING_TOKENS))
+_ALLOWED_PROGRAMS = frozenset({"firefox", "find", "ls", "cat", "grep", "head", "tail", "cp", "mv",
+                               "mkdir", "tar", "unzip", "xdg-open", "python3"})
+# Printable ASCII plus shlex's whitespace, without quotes or backslashes: for
+# these shlex.split is the same as splitting on _SHLEX_WS_RE
+_PLAIN_COMMAND_RE = re.compile(r"[\t\n\r !#-&(-\[\]-~]*")
+_SHLEX_WS_RE = re.compile(r"[ \t\r\n]+")
+
+
 def is_command_safe(command):
     """Naive safety check for a single command string.
 
@@ -211,15 +397,14 @@ def is_command_safe(command):
     if not command or not isinstance(command, str):
         return False, "Empty or invalid command"
 
-    low = command.lower()
-    for tok in ("rm", "shutdown", "reboot", "init 0", ":(){" , "mkfs", "dd "):
-        if tok in low:
-            return False, f"Disallowed token: {tok}"
+    m = _DISALLOWED_RE.search(command.lower())
+    if m:
+        return False, f"Disallowed token: {m.group()}"
 
     # Disallow shell chaining characters
-    for t in [";", "&&", "|", "$(" , "`"]:
-        if t in command:
-            return False, f"Shell chaining or substitution detected: {t}"
+    m = _CHAINING_RE.search(command)
+    if m:
+        return False, f"Shell chaining or substitution detected: {m.group()}"
 
     # If it's a bash -lc wrapper, still allow but be conservative
     if command.strip().startswith("bash -lc"):
@@ -230,12 +415,14 @@ def is_command_safe(command):
 
     # Otherwise allow safe binaries (simple heuristic): allow if first token is in allowlist
     try:
-        parts = shlex.split(command)
+        if _PLAIN_COMMAND_RE.fullmatch(command):
+            parts = [p for p in _SHLEX_WS_RE.split(command, 2) if p]
+        else:
+            parts = shlex.split(command)
         if not parts:
             return False, "Could not parse command"
-        allow = {"firefox", "find", "ls", "cat", "grep", "head", "tail", "cp", "mv", "mkdir", "tar", "unzip", "xdg-open", "python3"}
-        first = os.path.basename(parts[0])
-        if first in allow:
+        first = parts[0].rpartition("/")[2]
+        if first in _ALLOWED_PROGRAMS:
             return True, "Allowed program"
         else:
             return False, f"Program '{first}' not in allowlist"
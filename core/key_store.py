@@ -13,10 +13,16 @@ API:
   set_default_provider(provider)
   get_default_provider() -> provider or None
 """
+import copy
 import json
 import os
+import threading
 from typing import Optional
 
+# Parsed store, reused until the file's mtime/size change
+_cache_lock = threading.Lock()
+_cache = {"path": None, "stamp": None, "data": {}}
+
 
 def get_store_path() -> str:
     d = os.path.expanduser("~/.auraos")
@@ -36,29 +42,46 @@ def get_store_path() -> str:
 
 def _load_store() -> dict:
     path = get_store_path()
-    if not os.path.exists(path):
+    try:
+        st = os.stat(path)
+    except OSError:
         return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    with _cache_lock:
+        if _cache["path"] == path and _cache["stamp"] == stamp:
+            # Callers mutate the returned dict before saving; hand out a copy
+            return copy.deepcopy(_cache["data"])
     try:
         with open(path, "r", encoding="utf-8") as f:
-            return json.load(f) or {}
+            data = json.load(f) or {}
     except Exception:
         return {}
+    with _cache_lock:
+        _cache.update(path=path, stamp=stamp, data=data)
+    return copy.deepcopy(data)
 
 
 def _save_store(d: dict):
     path = get_store_path()
+    with _cache_lock:
+        _cache["stamp"] = None
     tmp = path + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
+    # Create the temp file 0o600 from the start so the keys are never briefly
+    # readable by others; fchmod covers a stale temp file left with other modes
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        try:
+            os.fchmod(fd, 0o600)
+        except Exception:
+            pass
         json.dump(d, f, indent=2)
+        f.flush()
+        os.fsync(fd)
     try:
         os.replace(tmp, path)
     except Exception:
         # best-effort
         os.rename(tmp, path)
-    try:
-        os.chmod(path, 0o600)
-    except Exception:
-        pass
 
 
 def get_key(provider: str) -> Optional[str]: